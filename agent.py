@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from logger_config import setup_logging
 from langchain_openai import ChatOpenAI
@@ -5,7 +6,7 @@ from langchain.agents import tool, AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from dotenv import load_dotenv
 import yaml
-from retriever_factory import create_advanced_retriever
+from retriever_factory import create_advanced_retriever, batch_retrieve
 
 load_dotenv()
 
@@ -37,6 +38,7 @@ try:
         embedding_model_name=BEST_EMBEDDING_MODEL,
         k_value=config['agent']['retriever_k'],
         retriever_config=config['retriever_models'],
+        vector_store_config=config.get('vector_store'),
     )
 except Exception as retr_err:  
     logging.error(
@@ -44,6 +46,22 @@ except Exception as retr_err:
     )
     retriever = None
 
+SEARCH_UNAVAILABLE_MESSAGE = (
+    "O mecanismo de busca não está disponível. Verifique se o índice de vetores foi gerado "
+    "(execute o script de ingestão) ou se há dependências ausentes."
+)
+
+def format_docs_as_context(docs: list) -> str:
+    """
+    Formata os trechos recuperados como contexto para o LLM, com fonte e página de cada um.
+    """
+    return "\n\n---\n\n".join(
+        [
+            f"Fonte: {doc.metadata.get('source', 'N/A')}, Página: {doc.metadata.get('page', 'N/A')}\nConteúdo: {doc.page_content}"
+            for doc in docs
+        ]
+    )
+
 @tool
 def search_in_documents(search_query: str) -> str: 
     """
@@ -57,38 +75,85 @@ def search_in_documents(search_query: str) -> str:
     logging.info(f"--- Agente chamou a ferramenta com query: '{search_query}' ---") # 
 
     if retriever is None:
-        return (
-            "O mecanismo de busca não está disponível. Verifique se o índice de vetores foi gerado "
-            "(execute o script de ingestão) ou se há dependências ausentes."
-        )
+        return SEARCH_UNAVAILABLE_MESSAGE
 
     docs = retriever.invoke(search_query)
     if not docs:
         return "Nenhuma informação relevante foi encontrada nos documentos para esta consulta."
 
-    context = "\n\n---\n\n".join(
-        [
-            f"Fonte: {doc.metadata.get('source', 'N/A')}, Página: {doc.metadata.get('page', 'N/A')}\nConteúdo: {doc.page_content}"
-            for doc in docs
-        ]
+    return format_docs_as_context(docs)
+
+def fuse_retrieval_results(results_per_query: list[list], top_n: int, rrf_k: int = 60) -> list:
+    """
+    Combina os resultados de várias consultas com Reciprocal Rank Fusion,
+    removendo os trechos duplicados (mesma fonte, página e conteúdo) e
+    mantendo apenas os top_n mais relevantes.
+    """
+    # Não reutiliza EnsembleRetriever.weighted_reciprocal_rank: ele exige uma instância com
+    # um retriever/peso por lista e deduplica só por page_content. Aqui o mesmo texto em
+    # páginas diferentes são citações distintas, por isso a chave inclui fonte e página.
+    scores = {}
+    unique_docs = {}
+    for docs in results_per_query:
+        for rank, doc in enumerate(docs):
+            key = (doc.metadata.get('source'), doc.metadata.get('page'), doc.page_content)
+            unique_docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+    ranked_keys = sorted(scores, key=scores.get, reverse=True)
+    return [unique_docs[key] for key in ranked_keys[:top_n]]
+
+@tool
+def search_multiple_in_documents(search_queries: list[str]) -> str:
+    """
+    Realiza, de uma só vez, buscas semânticas no OWASP Application Security Verification Standard v5.0.0 
+    para uma lista de sub-perguntas ou palavras-chave. Use esta ferramenta passando TODAS as questões 
+    específicas derivadas da pergunta do usuário em uma única chamada. Os trechos encontrados são 
+    combinados, sem duplicatas, e ordenados pela relevância em todas as consultas.
+    """
+
+    logging.info(f"--- Agente chamou a ferramenta com {len(search_queries)} queries: {search_queries} ---")
+
+    if retriever is None:
+        return SEARCH_UNAVAILABLE_MESSAGE
+
+    if not search_queries:
+        return "Nenhuma consulta foi informada."
+
+    results_per_query = batch_retrieve(retriever, search_queries)
+    docs = fuse_retrieval_results(
+        results_per_query,
+        top_n=config['agent'].get('multi_query_top_n', config['agent']['retriever_k']),
     )
-    return context
+    if not docs:
+        return "Nenhuma informação relevante foi encontrada nos documentos para estas consultas."
+
+    return format_docs_as_context(docs)
 
 def create_rag_agent():
     
-    tools = [search_in_documents]
+    multi_query = config['agent'].get('multi_query', False)
+
+    if multi_query:
+        tools = [search_multiple_in_documents]
+        tool_name = "search_multiple_in_documents"
+        tool_usage = f"chame a ferramenta {tool_name} uma única vez, passando todas as questões específicas na lista search_queries"
+    else:
+        tools = [search_in_documents]
+        tool_name = "search_in_documents"
+        tool_usage = f"use a ferramenta {tool_name} para cada questão específica"
     
-    SYSTEM_PROMPT = """
+    SYSTEM_PROMPT = f"""
     Você é um assistente especialista em análise de segurança de aplicações web chamado AnalistaIA. 
     Sua personalidade é analítica, precisa e objetiva.
 
     Siga estritamente estas regras:
 
     1. Raciocínio (Chain of Thought): Antes de responder, pense passo a passo. Primeiro, decomponha a pergunta 
-    do usuário em palavras-chave ou questões específicas. Segundo, use a ferramenta search_in_documents para 
-    cada questão específica. Terceiro, sintetize as informações recuperadas em uma resposta coesa.
+    do usuário em palavras-chave ou questões específicas. Segundo, {tool_usage}. 
+    Terceiro, sintetize as informações recuperadas em uma resposta coesa.
 
-    2. Uso da Ferramenta: Sempre utilize a ferramenta search_in_documents para obter o contexto. Nunca responda 
+    2. Uso da Ferramenta: Sempre utilize a ferramenta {tool_name} para obter o contexto. Nunca responda 
     com base em conhecimento prévio. Se a primeira busca não retornar resultados, tente reformular a query 
     de busca para ser mais específica ou mais geral, dependendo do caso.
 
@@ -122,15 +187,22 @@ if __name__ == '__main__':
     rag_agent = create_rag_agent()
     logging.info("Agente RAG iniciado. Faça suas perguntas. Pressione Ctrl+C para sair.")
 
+    # Um único event loop para toda a sessão: o cliente HTTP assíncrono do ChatOpenAI é reutilizado.
+    # O input() fica na thread principal para que o Ctrl+C encerre o agente imediatamente.
+    loop = asyncio.new_event_loop()
+
     try:
         while True:
             
             question = input("\nSua Pergunta: ")
 
-            response = rag_agent.invoke({"input": question})
+            # ainvoke executa em paralelo as chamadas de ferramenta feitas pelo modelo no mesmo turno
+            response = loop.run_until_complete(rag_agent.ainvoke({"input": question}))
 
             logging.info("\n--- Resposta do Agente ---")
             logging.info(response["output"])
     except KeyboardInterrupt:
         
-        logging.info("\n\nEncerrando o agente. Até logo!")
\ No newline at end of file
+        logging.info("\n\nEncerrando o agente. Até logo!")
+    finally:
+        loop.close()
@@ -85,7 +85,7 @@ def llm_as_judge(question: str, retrieved_chunks: list, judge_model_name: str) -
 
 
 # AJUSTE 1: Removido o parâmetro 'index_path' da assinatura da função
-def evaluate_retrieval_strategy(test_set_path: str, embedding_model_name: str, retriever_k: int, judge_model_name: str, retriever_config: dict, partition_name: str):
+def evaluate_retrieval_strategy(test_set_path: str, embedding_model_name: str, retriever_k: int, judge_model_name: str, retriever_config: dict, partition_name: str, vector_store_config: dict | None = None):
     """
     Avalia uma estratégia de recuperação de dados usando um conjunto de testes e um juiz LLM.
     """
@@ -97,7 +97,8 @@ def evaluate_retrieval_strategy(test_set_path: str, embedding_model_name: str, r
         partition_name=partition_name,
         embedding_model_name=embedding_model_name,
         k_value=retriever_k,
-        retriever_config=retriever_config
+        retriever_config=retriever_config,
+        vector_store_config=vector_store_config
     )
 
     results = []
@@ -151,7 +152,8 @@ if __name__ == '__main__':
                 retriever_k=config['evaluator']['retriever_k'],
                 judge_model_name=config['evaluator']['llm_judge'],
                 retriever_config=config['retriever_models'],
-                partition_name=partition_name
+                partition_name=partition_name,
+                vector_store_config=config.get('vector_store')
             )
         except Exception as eval_err:
             logging.error(
@@ -1,14 +1,18 @@
 import os
 import json
+import shutil
+import tempfile
 import yaml
 import logging
 from logger_config import setup_logging
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
-# Removido: from langchain_community.vectorstores import FAISS
 from langchain_experimental.text_splitter import SemanticChunker
 from langchain_core.documents import Document
 from pymilvus import connections, Collection, utility, Partition
+import numpy as np
+import faiss
+from vector_store_config import resolve_vector_store_config
 
 with open('config.yaml', 'r', encoding='utf-8') as f:
     config = yaml.safe_load(f)
@@ -20,6 +24,8 @@ MILVUS_URI = os.getenv("MILVUS_AMB_URI")
 MILVUS_COLLECTION_NAME = os.getenv("MILVUS_COLLECTION_NAME")
 MILVUS_DB_NAME = os.getenv("MILVUS_DB_NAME")
 
+VECTOR_STORE_CONFIG = resolve_vector_store_config(config.get("vector_store"))
+
 
 def insert_data_into_milvus(collection: Collection, chunks: list, embedding_model, partition_name: str):    
     """
@@ -59,7 +65,7 @@ def insert_data_into_milvus(collection: Collection, chunks: list, embedding_mode
 def process_and_store_documents(docs: list, strategy: dict):
     """
     Recebe uma lista de documentos, aplica uma estratégia de chunking
-    e armazena o resultado no Milvus.
+    e armazena o resultado no backend vetorial configurado (Milvus ou FAISS local).
     """
     chunk_method = strategy.get("chunk_method", "recursive")
     embedding_model_name = strategy['embedding_model']
@@ -84,6 +90,16 @@ def process_and_store_documents(docs: list, strategy: dict):
     chunks = text_splitter.split_documents(docs)
     logging.info(f"Total de chunks gerados: {len(chunks)}")
 
+    if VECTOR_STORE_CONFIG["backend"] == "faiss":
+        store_chunks_in_faiss(chunks, embedding_model, partition_name, VECTOR_STORE_CONFIG["faiss_index_dir"])
+    else:
+        store_chunks_in_milvus(chunks, embedding_model, partition_name)
+
+
+def store_chunks_in_milvus(chunks: list, embedding_model, partition_name: str):
+    """
+    Recria a partição no Milvus e insere os chunks nela.
+    """
     try:
         connections.connect(alias="default", uri=MILVUS_URI, db_name=MILVUS_DB_NAME)
         logging.info(f"Conexão com Milvus estabelecida em '{MILVUS_URI}' no DB '{MILVUS_DB_NAME}'.")
@@ -112,6 +128,64 @@ def process_and_store_documents(docs: list, strategy: dict):
         logging.info("Conexão com Milvus encerrada.")
 
 
+def store_chunks_in_faiss(chunks: list, embedding_model, partition_name: str, index_dir: str):
+    """
+    Gera embeddings para os chunks e grava um índice FAISS local por partição,
+    acompanhado de um arquivo JSON com o texto e os metadados de cada chunk.
+    O índice é lido via memory-map pelo retriever_factory, sem precisar do Milvus.
+    """
+    logging.info(f"Iniciando a gravação de {len(chunks)} chunks no índice FAISS da partição '{partition_name}'...")
+
+    if not chunks:
+        logging.error("Nenhum chunk gerado. O índice FAISS não será criado.")
+        return
+
+    texts = [chunk.page_content for chunk in chunks]
+    try:
+        embeddings = np.asarray(embedding_model.embed_documents(texts), dtype="float32")
+        logging.info("Embeddings gerados com sucesso.")
+    except Exception as e:
+        logging.error(f"Falha ao gerar embeddings: {e}")
+        return
+
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+
+    metadata = [
+        {
+            "chunk_text": chunk.page_content,
+            "source": chunk.metadata.get("source", "N/A"),
+            "page": int(chunk.metadata.get("page", 0))
+        }
+        for chunk in chunks
+    ]
+
+    partition_dir = os.path.join(index_dir, partition_name)
+    os.makedirs(index_dir, exist_ok=True)
+    # Diretório temporário no mesmo disco, para que os renames abaixo sejam atômicos
+    staging_dir = tempfile.mkdtemp(dir=index_dir, prefix=f".{partition_name}-")
+
+    try:
+        faiss.write_index(index, os.path.join(staging_dir, "index.faiss"))
+        with open(os.path.join(staging_dir, "chunks.json"), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+
+        # Troca o diretório da partição inteiro: índice e metadados nunca ficam de versões diferentes.
+        # Se o processo cair entre os dois renames, a partição fica ausente (erro claro no carregamento).
+        old_dir = None
+        if os.path.exists(partition_dir):
+            old_dir = staging_dir + "-old"
+            os.replace(partition_dir, old_dir)
+        os.replace(staging_dir, partition_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        logging.info(f"{index.ntotal} chunks gravados com sucesso em '{partition_dir}'.")
+
+    except Exception as e:
+        logging.error(f"Erro ao gravar o índice FAISS: {e}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
 if __name__ == '__main__':
     setup_logging()
     
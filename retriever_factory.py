@@ -1,8 +1,13 @@
+import json
 import logging
 import os
+import faiss
+import numpy as np
 from langchain.schema.retriever import BaseRetriever
-# Removido: from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
 from langchain_community.retrievers import BM25Retriever
+from langchain_core.vectorstores import VectorStoreRetriever
 from langchain.retrievers import EnsembleRetriever, ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import CrossEncoderReranker
 from langchain_huggingface import HuggingFaceEmbeddings
@@ -10,6 +15,7 @@ from langchain_core.documents import Document
 from langchain_milvus.vectorstores import Milvus
 from pymilvus import connections, utility, Collection, Partition
 from dotenv import load_dotenv
+from vector_store_config import resolve_vector_store_config
 
 load_dotenv()
 
@@ -54,39 +60,58 @@ def get_all_documents_from_milvus(collection: Collection, partition_name: str) -
     return docs
 
 
-def create_advanced_retriever(
-    partition_name: str, 
-    embedding_model_name: str,
-    k_value: int,
-    retriever_config: dict,
-) -> BaseRetriever:
+def load_faiss_partition(index_dir: str, partition_name: str) -> tuple[faiss.Index, list[Document]]:
     """
-    Cria e configura um retriever avançado que utiliza busca híbrida (Milvus + BM25) e re-ranking.
+    Carrega o índice FAISS de uma partição via memory-map, junto com os chunks do arquivo
+    de metadados gerado pelo script de ingestão.
     """
-    logging.info(f"Criando retriever avançado para a partição '{partition_name}'...")
+    partition_dir = os.path.join(index_dir, partition_name)
+    index_path = os.path.join(partition_dir, "index.faiss")
+    metadata_path = os.path.join(partition_dir, "chunks.json")
 
-    # --- 1. Carrega o modelo de embeddings (semelhante ao anterior) ---
-    fallback_model = retriever_config.get(
-        "default_embedding_fallback", "all-MiniLM-L6-v2"
-    )
-    # A lógica de fallback do modelo de embedding permanece a mesma
-    resolved_embedding_name = embedding_model_name
-    if os.path.sep in embedding_model_name and not os.path.exists(embedding_model_name):
-        logging.warning(
-            "Modelo de embeddings '%s' não encontrado. Usando fallback '%s'.",
-            embedding_model_name, fallback_model
+    if not os.path.exists(index_path) or not os.path.exists(metadata_path):
+        raise FileNotFoundError(
+            f"Índice FAISS da partição '{partition_name}' não encontrado em '{partition_dir}'. Execute o script de ingestão."
         )
-        resolved_embedding_name = fallback_model
+
+    # IO_FLAG_MMAP_IFC mapeia os vetores de índices "flat" direto do arquivo (faiss >= 1.10)
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
     try:
-        embedding_model = HuggingFaceEmbeddings(model_name=resolved_embedding_name)
-    except Exception as embed_err:
-        logging.error(
-            "Falha ao carregar embeddings '%s': %s. Usando fallback '%s'.",
-            resolved_embedding_name, embed_err, fallback_model
+        index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError as mmap_err:
+        logging.warning(
+            "Memory-map indisponível para '%s': %s. Carregando o índice em memória.", index_path, mmap_err
         )
-        embedding_model = HuggingFaceEmbeddings(model_name=fallback_model)
+        index = faiss.read_index(index_path)
+
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    docs = [
+        Document(
+            page_content=item['chunk_text'],
+            metadata={
+                'source': item['source'],
+                'page': item['page']
+            }
+        )
+        for item in metadata
+    ]
+
+    if index.ntotal != len(docs):
+        raise ValueError(
+            f"Índice FAISS ({index.ntotal} vetores) e metadados ({len(docs)} chunks) da partição '{partition_name}' estão dessincronizados."
+        )
+
+    logging.info(f"{len(docs)} chunks carregados do índice FAISS da partição '{partition_name}'.")
 
-    # --- 2. Conecta ao Milvus e prepara os retrievers ---
+    return index, docs
+
+
+def create_milvus_retrievers(partition_name: str, embedding_model) -> tuple[BaseRetriever, BaseRetriever]:
+    """
+    Conecta ao Milvus e cria os retrievers semântico e BM25 para a partição.
+    """
     try:
         # Pega as informações de conexão do .env
         uri = os.getenv("MILVUS_AMB_URI")
@@ -125,9 +150,98 @@ def create_advanced_retriever(
         logging.error(f"Falha ao conectar ou configurar retrievers com o Milvus: {e}")
         raise
 
+    return bm25_retriever, milvus_retriever
+
+
+def create_faiss_retrievers(partition_name: str, embedding_model, index_dir: str) -> tuple[BaseRetriever, BaseRetriever]:
+    """
+    Cria os retrievers semântico e BM25 a partir do índice FAISS local da partição.
+    """
+    try:
+        index, all_chunks = load_faiss_partition(index_dir, partition_name)
+
+        if not all_chunks:
+            raise ValueError("Nenhum documento encontrado no índice FAISS para inicializar o BM25.")
+
+        # O fallback de embeddings pode trocar o modelo usado na ingestão por outro de dimensão diferente
+        embedding_dim = len(embedding_model.embed_query(""))
+        if embedding_dim != index.d:
+            raise ValueError(
+                f"O modelo de embeddings gera vetores de dimensão {embedding_dim}, mas o índice FAISS da partição "
+                f"'{partition_name}' tem dimensão {index.d}. Use o mesmo modelo da ingestão ou refaça a ingestão."
+            )
+
+        docstore = InMemoryDocstore({str(i): doc for i, doc in enumerate(all_chunks)})
+        faiss_retriever = FAISS(
+            embedding_function=embedding_model,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id={i: str(i) for i in range(len(all_chunks))},
+        ).as_retriever(search_kwargs={"k": 15})
+
+        logging.info("Retriever do FAISS (semântico) criado com sucesso.")
+
+        bm25_retriever = BM25Retriever.from_documents(all_chunks)
+        bm25_retriever.k = 15
+        logging.info("Retriever BM25 (palavra-chave) criado com sucesso.")
+
+    except Exception as e:
+        logging.error(f"Falha ao carregar o índice FAISS: {e}")
+        raise
+
+    return bm25_retriever, faiss_retriever
+
+
+def create_advanced_retriever(
+    partition_name: str, 
+    embedding_model_name: str,
+    k_value: int,
+    retriever_config: dict,
+    vector_store_config: dict | None = None,
+) -> BaseRetriever:
+    """
+    Cria e configura um retriever avançado que utiliza busca híbrida (vetorial + BM25) e re-ranking.
+    O backend vetorial (Milvus ou FAISS local) é escolhido pela seção 'vector_store' do config.yaml.
+    """
+    logging.info(f"Criando retriever avançado para a partição '{partition_name}'...")
+
+    # --- 1. Carrega o modelo de embeddings (semelhante ao anterior) ---
+    fallback_model = retriever_config.get(
+        "default_embedding_fallback", "all-MiniLM-L6-v2"
+    )
+    # A lógica de fallback do modelo de embedding permanece a mesma
+    resolved_embedding_name = embedding_model_name
+    if os.path.sep in embedding_model_name and not os.path.exists(embedding_model_name):
+        logging.warning(
+            "Modelo de embeddings '%s' não encontrado. Usando fallback '%s'.",
+            embedding_model_name, fallback_model
+        )
+        resolved_embedding_name = fallback_model
+    try:
+        embedding_model = HuggingFaceEmbeddings(model_name=resolved_embedding_name)
+    except Exception as embed_err:
+        logging.error(
+            "Falha ao carregar embeddings '%s': %s. Usando fallback '%s'.",
+            resolved_embedding_name, embed_err, fallback_model
+        )
+        embedding_model = HuggingFaceEmbeddings(model_name=fallback_model)
+
+    # --- 2. Prepara os retrievers semântico e BM25 no backend configurado ---
+    vector_store_config = resolve_vector_store_config(vector_store_config)
+    backend = vector_store_config["backend"]
+
+    if backend == "faiss":
+        bm25_retriever, vector_retriever = create_faiss_retrievers(
+            partition_name,
+            embedding_model,
+            vector_store_config["faiss_index_dir"],
+        )
+    else:
+        bm25_retriever, vector_retriever = create_milvus_retrievers(partition_name, embedding_model)
+
     # --- 4. Cria o retriever híbrido (Ensemble) ---
     ensemble_retriever = EnsembleRetriever(
-        retrievers=[bm25_retriever, milvus_retriever],
+        retrievers=[bm25_retriever, vector_retriever],
         weights=[0.25, 0.75], # Dando mais peso para a busca semântica
     )
 
@@ -147,11 +261,127 @@ def create_advanced_retriever(
             base_compressor=compressor,
             base_retriever=ensemble_retriever,
         )
-        logging.info("Retriever avançado criado com sucesso (Híbrido Milvus + Re-ranker).")
+        logging.info("Retriever avançado criado com sucesso (Híbrido %s + Re-ranker).", backend)
         return compression_retriever
         
     except Exception as rerank_err:
         logging.warning(
             "Falha ao configurar o re-ranker: %s. Retornando retriever híbrido.", rerank_err
         )
-        return ensemble_retriever
\ No newline at end of file
+        return ensemble_retriever
+
+
+def _embed_queries(embedding_model, queries: list[str]) -> list[list[float]]:
+    """
+    Gera os embeddings de várias consultas com as mesmas configurações de embed_query,
+    mas em uma única chamada ao modelo quando ele é um HuggingFaceEmbeddings.
+    """
+    if isinstance(embedding_model, HuggingFaceEmbeddings):
+        # Mesma escolha de kwargs de HuggingFaceEmbeddings.embed_query (ex.: prompt de consulta do BGE)
+        query_kwargs = embedding_model.query_encode_kwargs or embedding_model.encode_kwargs
+        return embedding_model._embed(queries, query_kwargs)
+
+    return [embedding_model.embed_query(query) for query in queries]
+
+
+def _batch_vector_search(vector_retriever: VectorStoreRetriever, query_vectors: list[list[float]]) -> list[list[Document]]:
+    """
+    Executa uma única busca vetorial com todas as consultas (nq = len(query_vectors)).
+    """
+    vectorstore = vector_retriever.vectorstore
+    k = vector_retriever.search_kwargs.get("k", 4)
+
+    if isinstance(vectorstore, FAISS):
+        _, ids = vectorstore.index.search(np.asarray(query_vectors, dtype="float32"), k)
+        return [
+            [
+                vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+                for i in row if i != -1
+            ]
+            for row in ids
+        ]
+
+    search_params = vectorstore.search_params
+    if isinstance(search_params, list):
+        search_params = search_params[0]
+    res = vectorstore.client.search(
+        vectorstore.collection_name,
+        data=query_vectors,
+        anns_field="embedding",
+        search_params=search_params or {},
+        limit=k,
+        output_fields=["chunk_text", "source", "page"],
+    )
+    return [
+        [
+            Document(
+                page_content=hit['entity']['chunk_text'],
+                metadata={
+                    'source': hit['entity']['source'],
+                    'page': hit['entity']['page']
+                }
+            )
+            for hit in hits
+        ]
+        for hits in res
+    ]
+
+
+def batch_retrieve(retriever: BaseRetriever, queries: list[str]) -> list[list[Document]]:
+    """
+    Recupera os documentos de várias consultas de uma só vez, com o mesmo pipeline
+    (BM25 + vetorial + re-ranking) de create_advanced_retriever, mas com uma única
+    chamada de embedding, uma única busca vetorial e uma única passada do Cross-Encoder.
+    Retorna uma lista de documentos por consulta, na mesma ordem de 'queries'.
+    """
+    compressor = None
+    ensemble = retriever
+    if isinstance(retriever, ContextualCompressionRetriever):
+        compressor = retriever.base_compressor
+        ensemble = retriever.base_retriever
+
+    if not isinstance(ensemble, EnsembleRetriever) or (
+        compressor is not None and not isinstance(compressor, CrossEncoderReranker)
+    ):
+        logging.warning("Retriever sem o formato esperado para busca em lote. Executando as consultas separadamente.")
+        return retriever.batch(queries)
+
+    bm25_retriever, vector_retriever = ensemble.retrievers
+
+    # --- 1. Embeddings de todas as consultas em uma única chamada ---
+    query_vectors = _embed_queries(vector_retriever.vectorstore.embeddings, queries)
+
+    # --- 2. Busca vetorial com todas as consultas de uma vez ---
+    vector_results = _batch_vector_search(vector_retriever, query_vectors)
+
+    # --- 3. BM25 e fusão híbrida por consulta (operações locais, sem custo de rede ou modelo) ---
+    candidates_per_query = [
+        ensemble.weighted_reciprocal_rank([
+            bm25_retriever.vectorizer.get_top_n(
+                bm25_retriever.preprocess_func(query), bm25_retriever.docs, n=bm25_retriever.k
+            ),
+            vector_docs,
+        ])
+        for query, vector_docs in zip(queries, vector_results)
+    ]
+
+    if compressor is None:
+        return candidates_per_query
+
+    # --- 4. Re-ranking de todos os pares (consulta, candidato) em uma única chamada ---
+    pairs = [
+        (query, doc.page_content)
+        for query, candidates in zip(queries, candidates_per_query)
+        for doc in candidates
+    ]
+    scores = compressor.model.score(pairs) if pairs else []
+
+    results = []
+    offset = 0
+    for candidates in candidates_per_query:
+        query_scores = scores[offset:offset + len(candidates)]
+        offset += len(candidates)
+        ranked = sorted(zip(candidates, query_scores), key=lambda pair: pair[1], reverse=True)
+        results.append([doc for doc, _ in ranked[:compressor.top_n]])
+
+    return results
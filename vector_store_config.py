@@ -0,0 +1,22 @@
+# vector_store_config.py
+
+VECTOR_STORE_BACKENDS = {"milvus", "faiss"}
+
+DEFAULT_VECTOR_STORE_CONFIG = {
+    "backend": "milvus",
+    "faiss_index_dir": "vector_indexes/",
+}
+
+
+def resolve_vector_store_config(vector_store_config: dict | None) -> dict:
+    """
+    Completa a seção 'vector_store' do config.yaml com os valores padrão e valida o backend escolhido.
+    """
+    resolved = {**DEFAULT_VECTOR_STORE_CONFIG, **(vector_store_config or {})}
+
+    if resolved["backend"] not in VECTOR_STORE_BACKENDS:
+        raise ValueError(
+            f"Backend vetorial '{resolved['backend']}' inválido no config.yaml. Use um destes: {sorted(VECTOR_STORE_BACKENDS)}."
+        )
+
+    return resolved